@@ -1,29 +1,82 @@
-from dataclasses import dataclass
-from typing import List, Set, Tuple
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set, TextIO, Tuple
 from collections import deque
 
-from models import DatalogProgram, Fact, Predicate, Rule
+from models import (
+    DatalogProgram,
+    Fact,
+    FactStore,
+    Predicate,
+    Relation,
+    Rule,
+    intern_atom,
+)
+from sips import make_body_order
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AdornedPredicate(Predicate):
     """
     Represents a predicate that includes a binding pattern used to optimize query processing.
 
     Attributes:
         name (str): The name of the predicate.
-        args (List[str]): A list of arguments for the predicate.
+        args (Tuple[str, ...]): A tuple of arguments for the predicate.
         binding_pattern (str): A pattern indicating which arguments are bound ('b') and which are free ('f').
+
+    The adorned name and the bound arguments are derived on first use and cached on the
+    instance; since adorned predicates are interned, they are computed once per distinct atom.
     """
 
     binding_pattern: str
+    _adorned_name: str = field(default=None, init=False, repr=False, compare=False)
+    _bound_args: tuple = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if type(self.args) is not tuple:
+            object.__setattr__(self, "args", tuple(self.args))
+        object.__setattr__(
+            self, "_hash", hash((self.name, self.args, self.binding_pattern))
+        )
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            self._hash == other._hash
+            and self.name == other.name
+            and self.binding_pattern == other.binding_pattern
+            and self.args == other.args
+        )
 
     def __repr__(self) -> str:
         return f"{self.name}_{self.binding_pattern}({', '.join(self.args)})"
 
     def adorned_name(self) -> str:
-        """Generate the adorned name of the predicate."""
-        return f"{self.name}_{self.binding_pattern}"
+        """Return the adorned name of the predicate."""
+        adorned_name = self._adorned_name
+        if adorned_name is None:
+            adorned_name = sys.intern(f"{self.name}_{self.binding_pattern}")
+            object.__setattr__(self, "_adorned_name", adorned_name)
+        return adorned_name
+
+    def bound_arguments(self) -> tuple:
+        """Return the arguments in the positions marked as bound by the binding pattern."""
+        bound_args = self._bound_args
+        if bound_args is None:
+            bound_args = tuple(
+                arg
+                for arg, bound in zip(self.args, self.binding_pattern)
+                if bound == "b"
+            )
+            object.__setattr__(self, "_bound_args", bound_args)
+        return bound_args
 
 
 def adorn_predicate(predicate: Predicate, binding_pattern: str) -> AdornedPredicate:
@@ -35,9 +88,11 @@ def adorn_predicate(predicate: Predicate, binding_pattern: str) -> AdornedPredic
         binding_pattern (str): The binding pattern for the predicate.
 
     Returns:
-        AdornedPredicate: The newly created adorned predicate.
+        AdornedPredicate: The interned adorned predicate.
     """
-    return AdornedPredicate(predicate.name, predicate.args, binding_pattern)
+    return intern_atom(
+        AdornedPredicate(predicate.name, predicate.args, binding_pattern)
+    )
 
 
 def determine_case_based_binding(args: List[str]) -> str:
@@ -51,7 +106,7 @@ def determine_case_based_binding(args: List[str]) -> str:
         str: A binding pattern string.
     """
     pattern = ["f" if arg.isupper() else "b" for arg in args]
-    return "".join(pattern)
+    return sys.intern("".join(pattern))
 
 
 def adorn_query(
@@ -99,50 +154,14 @@ def generate_binding_from_set(args: List[str], bound_variables: Set[str]) -> str
         str: A string representing the binding pattern, where 'b' indicates a bound variable and 'f' indicates a free variable.
     """
     pattern = ["b" if arg in bound_variables else "f" for arg in args]
-    return "".join(pattern)
-
-
-def greedy_binding_order(
-    datalog_program: DatalogProgram, body: List[Predicate]
-) -> List[Predicate]:
-    """
-    Sorts the predicates in a rule's body with a focus on optimization for query processing.
-    Extensional predicates are prioritized over intensional ones, and within the same category,
-    predicates with more arguments are given higher priority.
-
-    Args:
-        datalog_program (DatalogProgram): The Datalog program to query predicate status.
-        body (List[Predicate]): A list of Predicate objects that make up the body of a rule.
-
-    Returns:
-        List[Predicate]: A sorted list of Predicate objects based on defined criteria.
-    """
-
-    def sort_key(predicate: Predicate) -> tuple:
-        """
-        Defines the sorting criteria for predicates:
-        - First by type (extensional: 0, intensional: 1)
-        - Then by the number of arguments in descending order
-
-        Args:
-        - predicate (Predicate): The predicate to evaluate for sorting.
-
-        Returns:
-        - tuple: Tuple where the first element is type priority, and the second is the negative argument count.
-        """
-        is_intensional = datalog_program.is_predicate_intensional(predicate)
-        type_priority = 1 if is_intensional else 0
-        return (type_priority, -len(predicate.args))
-
-    ordered_body = sorted(body, key=sort_key)
-    return ordered_body
+    return sys.intern("".join(pattern))
 
 
 def adorn_rule(
     datalog_program: DatalogProgram,
     rule: Rule,
     binding_pattern: str,
-    reorder_body: bool = False,
+    order_body: Optional[Callable[[Rule, Set[str]], List[Predicate]]] = None,
 ) -> Rule:
     """
     Adorns a rule based on a specified binding pattern, sorts the predicates, and constructs a new rule.
@@ -153,6 +172,8 @@ def adorn_rule(
         datalog_program (DatalogProgram): The Datalog program for checking predicate statuses.
         rule (Rule): The rule to be adorned and sorted.
         binding_pattern (str): The binding pattern used to adorn the head predicate and influence body adornment.
+        order_body (Optional[Callable]): A function returning the body of the rule reordered, given
+            the variables bound by the head, as returned by sips.make_body_order, or None to keep the body order.
 
     Returns:
         Rule: A new Rule object with an adorned head and an ordered and adorned body.
@@ -161,11 +182,7 @@ def adorn_rule(
     bound_variables = set(rule.head.args)
     new_body = []
 
-    body = (
-        rule.body
-        if not reorder_body
-        else greedy_binding_order(datalog_program, rule.body)
-    )
+    body = rule.body if order_body is None else order_body(rule, bound_variables)
 
     for predicate in body:
         if datalog_program.is_predicate_intensional(predicate):
@@ -182,20 +199,35 @@ def adorn_rule(
     return Rule(new_head, new_body)
 
 
-def adorn_facts(facts, adorned_predicates_tuples):
-    adorned_facts = []
+def adorn_facts(
+    facts: FactStore, adorned_predicates_tuples: List[Tuple[str, str]]
+) -> List[Relation]:
+    """
+    Copy the facts of every adorned predicate under its binding pattern. The facts of each
+    predicate symbol are looked up by name in the fact store and copied column by column,
+    without building Fact objects.
+
+    Args:
+        facts (FactStore): The facts of the original program.
+        adorned_predicates_tuples (List[Tuple[str, str]]): The (name, binding pattern) pairs.
+
+    Returns:
+        List[Relation]: The adorned relations, sharing the symbol table of facts.
+    """
+    adorned_relations = []
     for name, binding_pattern in adorned_predicates_tuples:
-        relevant_facts = [fact for fact in facts if fact.predicate.name == name]
-        for fact in relevant_facts:
-            adorned_fact = Fact(
-                AdornedPredicate(name, fact.predicate.args, binding_pattern)
-            )
-            adorned_facts.append(adorned_fact)
-    return adorned_facts
+        for relation in facts.relations_named(name):
+            if relation.binding_pattern is None:
+                adorned_relations.append(
+                    relation.copy(binding_pattern, AdornedPredicate)
+                )
+    return adorned_relations
 
 
 def adorn_datalog_program(
-    datalog_program: DatalogProgram, reorder_body: bool = False
+    datalog_program: DatalogProgram,
+    sips: str = "none",
+    plan_log: Optional[TextIO] = None,
 ) -> tuple:
     """
     Adorn all rules in a Datalog program based on the adorned predicates derived from the query.
@@ -203,37 +235,46 @@ def adorn_datalog_program(
 
     Args:
         datalog_program (DatalogProgram): The Datalog program containing rules and a query to be adorned.
+        sips (str): The sideways information passing strategy ordering rule bodies, one of
+            sips.SIPS_STRATEGIES.
+        plan_log (Optional[TextIO]): A stream to which the chosen body order and its estimated
+            cost are reported for each adorned rule.
 
     Returns:
         tuple: A tuple containing a list of adorned rules, ready for optimized execution, and the adorned predicates.
     """
+    order_body = make_body_order(datalog_program, sips, plan_log)
     adorned_predicates, adorned_query_atoms = adorn_query(
         datalog_program, datalog_program.query
     )
+    # Each (predicate symbol, binding pattern) pair enters the worklist at most once, and only
+    # the rules defining its symbol are looked up in the head index, so the work done is
+    # proportional to the number of adorned rules produced.
     adorned_predicates_queue = deque(adorned_predicates)
-    seen = {predicate.adorned_name() for predicate in adorned_predicates_queue}
+    seen: Set[Tuple[str, str]] = {
+        (predicate.name, predicate.binding_pattern)
+        for predicate in adorned_predicates_queue
+    }
 
     adorned_rules = []
 
     while adorned_predicates_queue:
         current_adorned_predicate = adorned_predicates_queue.popleft()
-        for rule in datalog_program.rules:
-            if current_adorned_predicate.name == rule.head.name:
-                new_rule = adorn_rule(
-                    datalog_program,
-                    rule,
-                    current_adorned_predicate.binding_pattern,
-                    reorder_body,
-                )
-                adorned_rules.append(new_rule)
+        for rule in datalog_program.get_rules_defining(current_adorned_predicate.name):
+            new_rule = adorn_rule(
+                datalog_program,
+                rule,
+                current_adorned_predicate.binding_pattern,
+                order_body,
+            )
+            adorned_rules.append(new_rule)
 
-                for predicate in new_rule.body:
-                    if (
-                        isinstance(predicate, AdornedPredicate)
-                        and predicate.adorned_name() not in seen
-                    ):
+            for predicate in new_rule.body:
+                if isinstance(predicate, AdornedPredicate):
+                    key = (predicate.name, predicate.binding_pattern)
+                    if key not in seen:
+                        seen.add(key)
                         adorned_predicates_queue.append(predicate)
-                        seen.add(predicate.adorned_name())
 
     return adorned_rules, adorned_query_atoms, adorned_predicates
 
@@ -288,12 +329,47 @@ def example_program2():
     return program
 
 
+def example_chain_program(size: int) -> DatalogProgram:
+    """
+    Builds a synthetic program of 2 * size rules: a chain p0 :- p1 :- ... :- p<size> reachable
+    from the query, and as many rules over symbols the query does not depend on.
+    """
+    program = DatalogProgram()
+    program.add_fact(Fact(Predicate("edge", ["1", "2"])))
+    for i in range(size):
+        program.add_rule(
+            Rule(
+                Predicate(f"p{i}", ["X", "Y"]),
+                [Predicate("edge", ["X", "Z"]), Predicate(f"p{i + 1}", ["Z", "Y"])],
+            )
+        )
+        program.add_rule(
+            Rule(Predicate(f"unused{i}", ["X", "Y"]), [Predicate("edge", ["X", "Y"])])
+        )
+    program.add_rule(
+        Rule(Predicate(f"p{size}", ["X", "Y"]), [Predicate("edge", ["X", "Y"])])
+    )
+    program.set_query(Rule(Predicate("q", []), [Predicate("p0", ["1", "Y"])]))
+    return program
+
+
 def main():
     program = example_program1()
     adorned_rules = adorn_datalog_program(program)
     for rule in adorned_rules:
         print(rule)
 
+    from time import perf_counter
+
+    for size in (12500, 25000, 50000):
+        program = example_chain_program(size)
+        start = perf_counter()
+        adorned_rules, _, _ = adorn_datalog_program(program)
+        elapsed = perf_counter() - start
+        print(
+            f"{len(program.rules)} rules, {len(adorned_rules)} adorned: {elapsed:.2f}s"
+        )
+
 
 if __name__ == "__main__":
     main()
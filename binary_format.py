@@ -0,0 +1,139 @@
+import struct
+import sys
+from array import array
+
+from datalog_parser import add_parsed_line, parse_line
+from models import DatalogProgram
+from reader import open_datalog_file
+
+BINARY_MAGIC = b"DLGB"
+BINARY_VERSION = 1
+
+# magic, version, number of symbols, number of relations, size of the rule section
+_HEADER = struct.Struct("<4sHIII")
+# symbol id of the predicate name, arity, number of facts
+_RELATION_HEADER = struct.Struct("<III")
+_ID_TYPECODE = next(code for code in "IL" if array(code).itemsize == 4)
+
+
+def _id_array(values=()) -> array:
+    return array(_ID_TYPECODE, values)
+
+
+def _to_little_endian(ids: array) -> bytes:
+    if sys.byteorder == "big":
+        ids = _id_array(ids)
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def _from_little_endian(data) -> array:
+    ids = _id_array()
+    ids.frombytes(data)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+def write_binary_program(program: DatalogProgram, filename: str):
+    """
+    Writes a parsed Datalog program to a compact binary file.
+
+    The file consists of a header, the symbol table of the fact store (predicate names and
+    constants), one block per (predicate, arity) holding one column of 32-bit symbol ids per
+    argument, and finally the rules and the query in textual form, since they are few and
+    cheap to parse.
+
+    Args:
+        program (DatalogProgram): The program to write.
+        filename (str): The path of the binary file to create.
+    """
+    store = program.facts
+    relations = list(store.relations.values())
+    for relation in relations:
+        if relation.binding_pattern is not None:
+            raise ValueError("Adorned facts cannot be written in the binary format.")
+        store.symbols.encode(relation.name)
+
+    statements = [str(rule) for rule in program.rules]
+    if program.query:
+        statements.append(str(program.query))
+    rule_section = "\n".join(statements).encode("utf-8")
+
+    encoded_symbols = [symbol.encode("utf-8") for symbol in store.symbols]
+    with open_datalog_file(filename, "wb") as file:
+        file.write(
+            _HEADER.pack(
+                BINARY_MAGIC,
+                BINARY_VERSION,
+                len(encoded_symbols),
+                len(relations),
+                len(rule_section),
+            )
+        )
+        file.write(_to_little_endian(_id_array(map(len, encoded_symbols))))
+        file.write(b"".join(encoded_symbols))
+        for relation in relations:
+            file.write(
+                _RELATION_HEADER.pack(
+                    store.symbols.encode(relation.name), relation.arity, relation.count
+                )
+            )
+            for column in relation.columns:
+                file.write(_to_little_endian(_id_array(column)))
+        file.write(rule_section)
+
+
+def read_binary_program(filename: str) -> DatalogProgram:
+    """
+    Loads a Datalog program from a file written by write_binary_program.
+
+    Symbol lengths and fact columns are read with bulk array conversions and the columns are
+    appended to the program's fact store as they are, so no per-fact work is done in Python.
+
+    Args:
+        filename (str): The path of the binary file to read.
+
+    Returns:
+        DatalogProgram: The program stored in the file.
+    """
+    with open_datalog_file(filename, "rb") as file:
+        data = file.read()
+
+    with memoryview(data) as view:
+        magic, version, symbol_count, relation_count, rule_section_size = (
+            _HEADER.unpack_from(view)
+        )
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"The file '{filename}' is not a binary Datalog program.")
+        if version != BINARY_VERSION:
+            raise ValueError(
+                f"Unsupported binary program version {version} in '{filename}'."
+            )
+        offset = _HEADER.size
+
+        lengths = _from_little_endian(view[offset : offset + 4 * symbol_count])
+        offset += 4 * symbol_count
+        program = DatalogProgram()
+        store = program.facts
+        for length in lengths:
+            store.symbols.encode(
+                sys.intern(str(view[offset : offset + length], "utf-8"))
+            )
+            offset += length
+
+        for _ in range(relation_count):
+            name_id, arity, count = _RELATION_HEADER.unpack_from(view, offset)
+            offset += _RELATION_HEADER.size
+            columns = []
+            for _ in range(arity):
+                columns.append(_from_little_endian(view[offset : offset + 4 * count]))
+                offset += 4 * count
+            relation = store.add_relation(store.symbols.decode(name_id), arity)
+            relation.extend_columns(columns, count)
+
+        rule_section = str(view[offset : offset + rule_section_size], "utf-8")
+
+    for line in rule_section.splitlines():
+        add_parsed_line(program, parse_line(line))
+    return program
@@ -1,4 +1,169 @@
-from models import DatalogProgram, Fact, Predicate, Rule
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+from models import DatalogProgram, Fact, Predicate, Rule, intern_atom
+from reader import (
+    is_compressed,
+    iter_datalog_program,
+    iter_datalog_program_range,
+    split_datalog_program,
+)
+
+# Bump whenever the parsed representation changes, to invalidate cached parses.
+PARSER_VERSION = 6
+
+_TOKEN = re.compile(
+    r"""
+    \s*(?:
+        (?P<symbol>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<number>-?[0-9]+)
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<punct>:-|[(),.])
+      | (?P<end>$)
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+_SIMPLE_ATOM = re.compile(
+    r"\s*([A-Za-z_][A-Za-z0-9_]*)\s*"
+    r"(?:\((\s*-?[A-Za-z0-9_]+(?:\s*,\s*-?[A-Za-z0-9_]+)*\s*)?\)\s*)?"
+)
+_SIMPLE_FACT = re.compile(
+    r"\s*([A-Za-z_][A-Za-z0-9_]*)\s*"
+    r"(?:\((\s*-?[A-Za-z0-9_]+(?:\s*,\s*-?[A-Za-z0-9_]+)*\s*)?\)\s*)?\.?\s*"
+)
+_SIMPLE_TERM = re.compile(r"-?[A-Za-z0-9_]+")
+_WHITESPACE = re.compile(r"\s")
+
+
+def _simple_args(match: re.Match) -> tuple:
+    """Returns the interned arguments matched by the argument group of a simple atom or fact."""
+    args_str = match.group(2)
+    if not args_str:
+        return ()
+    if _WHITESPACE.search(args_str):
+        return tuple(map(sys.intern, _SIMPLE_TERM.findall(args_str)))
+    return tuple(map(sys.intern, args_str.split(",")))
+
+
+def _parse_simple_line(line: str):
+    """
+    Fast path of parse_line for statements whose terms are all plain symbols or numbers,
+    which covers virtually every line of a grounded theory. Returns None as soon as anything
+    else is found, so that the caller can fall back to the full scanner.
+    """
+    match = _SIMPLE_FACT.fullmatch(line)
+    if match is not None:
+        return Fact(Predicate(sys.intern(match.group(1)), _simple_args(match)))
+
+    atoms = []
+    pos = 0
+    is_rule = False
+    end = len(line)
+    while True:
+        match = _SIMPLE_ATOM.match(line, pos)
+        if match is None:
+            return None
+        atoms.append(Predicate(sys.intern(match.group(1)), _simple_args(match)))
+        pos = match.end()
+        if pos == end:
+            break
+        char = line[pos]
+        if char == ",":
+            if not is_rule:
+                return None
+            pos += 1
+        elif char == "." and not line[pos + 1 :].strip():
+            break
+        elif line.startswith(":-", pos) and not is_rule:
+            is_rule = True
+            pos += 2
+        else:
+            return None
+    if not is_rule or len(atoms) < 2:
+        return None
+    return Rule(intern_atom(atoms[0]), map(intern_atom, atoms[1:]))
+
+
+class _Scanner:
+    """
+    Single-pass recursive-descent parser over the tokens of one Datalog statement.
+
+    Tokens are matched in place with a compiled regular expression, so no intermediate
+    substrings are created besides the symbols and terms that end up in the Predicates.
+    Those are interned, so that every occurrence of a name or constant in the program
+    shares a single string object.
+    """
+
+    __slots__ = ("text", "pos", "kind", "value")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.kind = None
+        self.value = None
+        self.advance()
+
+    def advance(self):
+        match = _TOKEN.match(self.text, self.pos)
+        if match is None:
+            raise ValueError(
+                f"unexpected character {self.text[self.pos:].lstrip()[:1]!r} "
+                f"at position {self.pos}"
+            )
+        self.pos = match.end()
+        self.kind = match.lastgroup
+        self.value = match.group(self.kind)
+
+    def expect(self, punct: str):
+        if self.kind != "punct" or self.value != punct:
+            found = self.value if self.kind != "end" else "end of input"
+            raise ValueError(f"expected '{punct}' but found '{found}'")
+        self.advance()
+
+    def accept(self, punct: str) -> bool:
+        if self.kind == "punct" and self.value == punct:
+            self.advance()
+            return True
+        return False
+
+    def parse_term(self) -> str:
+        kind, value = self.kind, self.value
+        if kind not in ("symbol", "number", "string"):
+            found = value if kind != "end" else "end of input"
+            raise ValueError(f"expected a term but found '{found}'")
+        self.advance()
+        if kind == "symbol" and self.accept("("):
+            return sys.intern(f"{value}({', '.join(self.parse_terms())})")
+        return sys.intern(value)
+
+    def parse_terms(self) -> list:
+        terms = []
+        if self.accept(")"):
+            return terms
+        terms.append(self.parse_term())
+        while self.accept(","):
+            terms.append(self.parse_term())
+        self.expect(")")
+        return terms
+
+    def parse_atom(self) -> Predicate:
+        if self.kind != "symbol":
+            found = self.value if self.kind != "end" else "end of input"
+            raise ValueError(f"expected a predicate name but found '{found}'")
+        name = sys.intern(self.value)
+        self.advance()
+        args = self.parse_terms() if self.accept("(") else ()
+        return Predicate(name, args)
+
+    def parse_end(self):
+        self.accept(".")
+        if self.kind != "end":
+            raise ValueError(f"unexpected '{self.value}' after end of statement")
 
 
 def parse_predicate(predicate_str: str) -> Predicate:
@@ -12,17 +177,35 @@ def parse_predicate(predicate_str: str) -> Predicate:
         Predicate: A Predicate object.
     """
     try:
-        if "(" not in predicate_str or ")" not in predicate_str:
-            return Predicate(predicate_str.strip(), [])
-        predicate_name, args_str = predicate_str.split("(", 1)
-        args = args_str.strip(")").split(",")
-        return Predicate(predicate_name.strip(), [arg.strip() for arg in args])
+        scanner = _Scanner(predicate_str)
+        predicate = scanner.parse_atom()
+        scanner.parse_end()
+        return predicate
     except ValueError as e:
         raise ValueError(
             f"Error parsing predicate from string '{predicate_str}': {str(e)}"
         ) from e
 
 
+def scan_fact_signature(line: str) -> Tuple[str, int]:
+    """
+    Extracts the predicate symbol and arity of a fact line without building a Predicate.
+
+    Args:
+        line (str): A string representing a fact in the format 'Name(arg1, arg2, ...).'.
+
+    Returns:
+        Tuple[str, int]: The predicate symbol and the number of arguments.
+    """
+    open_paren = line.find("(")
+    if open_paren == -1:
+        return line.rstrip(". \t"), 0
+    if "(" in line[open_paren + 1 :] or '"' in line or "'" in line:
+        predicate = parse_predicate(line)
+        return predicate.name, predicate.arity()
+    return line[:open_paren].strip(), line.count(",", open_paren) + 1
+
+
 def parse_line(line: str):
     """
     Parses a single line of a Datalog program into either a Fact or a Rule object.
@@ -33,17 +216,20 @@ def parse_line(line: str):
     Returns:
         Either a Fact or Rule object depending on the line content.
     """
+    parsed_line = _parse_simple_line(line)
+    if parsed_line is not None:
+        return parsed_line
     try:
-        if ":-" not in line:
-            return Fact(parse_predicate(line.strip().rstrip(".")))
-        head_str, body_str = line.split(":-", 1)
-        head = parse_predicate(head_str.strip())
-        body = [
-            parse_predicate(pred.strip() + ")")
-            for pred in body_str.strip().rstrip(".").split("),")
-            if pred
-        ]
-        return Rule(head, body)
+        scanner = _Scanner(line)
+        head = scanner.parse_atom()
+        if not scanner.accept(":-"):
+            scanner.parse_end()
+            return Fact(head)
+        body = [intern_atom(scanner.parse_atom())]
+        while scanner.accept(","):
+            body.append(intern_atom(scanner.parse_atom()))
+        scanner.parse_end()
+        return Rule(intern_atom(head), body)
     except ValueError as e:
         raise ValueError(f"Error parsing line '{line}': {str(e)}") from e
 
@@ -59,16 +245,101 @@ def parse_datalog_program(program_lines: list) -> DatalogProgram:
         DatalogProgram: A DatalogProgram object filled with parsed facts and rules.
     """
     datalog_program = DatalogProgram()
+    facts = datalog_program.facts
     for line in program_lines:
-        if line.strip():
-            parsed_line = parse_line(line)
-            if isinstance(parsed_line, Fact):
-                datalog_program.add_fact(parsed_line)
-            elif isinstance(parsed_line, Rule):
-                if parsed_line.head.name == "goal__reachable":
-                    datalog_program.set_query(parsed_line)
-                else:
-                    datalog_program.add_rule(parsed_line)
+        match = _SIMPLE_FACT.fullmatch(line)
+        if match is not None:
+            # Plain facts go straight into the fact store, without a Fact object.
+            facts.add_row(sys.intern(match.group(1)), _simple_args(match))
+        elif line.strip():
+            add_parsed_line(datalog_program, parse_line(line))
+    return datalog_program
+
+
+def add_parsed_line(datalog_program: DatalogProgram, parsed_line):
+    """
+    Adds a parsed Fact or Rule to a DatalogProgram, treating 'goal__reachable' rules as the query.
+
+    Args:
+        datalog_program (DatalogProgram): The program to extend.
+        parsed_line: A Fact or Rule object as returned by parse_line.
+    """
+    if isinstance(parsed_line, Fact):
+        datalog_program.add_fact(parsed_line)
+    elif isinstance(parsed_line, Rule):
+        if parsed_line.head.name == "goal__reachable":
+            datalog_program.set_query(parsed_line)
+        else:
+            datalog_program.add_rule(parsed_line)
+
+
+def parse_relevant_datalog_program(filename: str) -> DatalogProgram:
+    """
+    Parses a Datalog program file in two passes, keeping only the facts the query depends on.
+
+    The first pass parses the rules and the query while skipping fact lines. The predicates
+    reachable from the query are then computed, and the second pass parses only the facts of
+    those predicates; all other fact lines are discarded without building any object.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program.
+
+    Returns:
+        DatalogProgram: A DatalogProgram object with the rules, the query and the relevant facts.
+    """
+    datalog_program = DatalogProgram()
+    for line in iter_datalog_program(filename):
+        if ":-" in line:
+            add_parsed_line(datalog_program, parse_line(line))
+
+    relevant_predicates = datalog_program.get_relevant_predicates()
+    for line in iter_datalog_program(filename):
+        if ":-" not in line and scan_fact_signature(line)[0] in relevant_predicates:
+            datalog_program.add_fact(parse_line(line))
+    return datalog_program
+
+
+def _parse_range(filename: str, start: int, end: int) -> list:
+    """Parses every line in a byte range of a file, keeping the order of the statements."""
+    return [
+        parse_line(line) for line in iter_datalog_program_range(filename, start, end)
+    ]
+
+
+def parse_datalog_program_parallel(filename: str, jobs: int) -> DatalogProgram:
+    """
+    Parses a Datalog program file using several worker processes.
+
+    The file is split into byte ranges aligned on line boundaries, each range is parsed in a
+    separate process, and the results are merged in file order so that the resulting program
+    is identical to the one produced by parse_datalog_program. Compressed files cannot be
+    split and are parsed sequentially.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program.
+        jobs (int): The number of worker processes.
+
+    Returns:
+        DatalogProgram: A DatalogProgram object filled with parsed facts and rules.
+    """
+    if is_compressed(filename):
+        return parse_datalog_program(iter_datalog_program(filename))
+
+    ranges = split_datalog_program(filename, jobs)
+    datalog_program = DatalogProgram()
+    if len(ranges) <= 1:
+        for start, end in ranges:
+            for parsed_line in _parse_range(filename, start, end):
+                add_parsed_line(datalog_program, parsed_line)
+        return datalog_program
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(ranges))) as executor:
+        futures = [
+            executor.submit(_parse_range, filename, start, end) for start, end in ranges
+        ]
+        for future in futures:
+            for parsed_line in future.result():
+                add_parsed_line(datalog_program, parsed_line)
     return datalog_program
 
 
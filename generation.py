@@ -1,7 +1,13 @@
+import sys
 from typing import List
 
 from adornment import AdornedPredicate
-from models import Rule
+from models import Rule, intern_atom
+
+
+# Magic counterparts of the adorned predicates seen so far, since the same rule heads and
+# body atoms are turned into magic atoms by the generation, modification and processing steps.
+_magic_predicates: dict = {}
 
 
 def generate_magic_predicate(adorned_predicate: AdornedPredicate) -> AdornedPredicate:
@@ -17,17 +23,19 @@ def generate_magic_predicate(adorned_predicate: AdornedPredicate) -> AdornedPred
         adorned_predicate (AdornedPredicate): The adorned predicate to transform.
 
     Returns:
-        AdornedPredicate: A new adorned predicate representing the "magic" version.
+        AdornedPredicate: The interned adorned predicate representing the "magic" version.
     """
-    bound_arguments = [
-        arg
-        for arg, bound in zip(adorned_predicate.args, adorned_predicate.binding_pattern)
-        if bound == "b"
-    ]
-    magic_name = f"magic_{adorned_predicate.name}"
-    return AdornedPredicate(
-        magic_name, bound_arguments, "".join("b" for _ in bound_arguments)
-    )
+    magic_predicate = _magic_predicates.get(adorned_predicate)
+    if magic_predicate is None:
+        bound_arguments = adorned_predicate.bound_arguments()
+        magic_name = sys.intern(f"magic_{adorned_predicate.name}")
+        magic_predicate = intern_atom(
+            AdornedPredicate(
+                magic_name, bound_arguments, sys.intern("b" * len(bound_arguments))
+            )
+        )
+        _magic_predicates[adorned_predicate] = magic_predicate
+    return magic_predicate
 
 
 def generate_magic_rules(rule: Rule) -> List[Rule]:
@@ -1,46 +1,58 @@
 #! /usr/bin/env python
 
 import argparse
+import json
+import os
 import sys
-from typing import List, Set, Tuple
+from typing import List, Optional, Set, TextIO, Tuple
 
 from adornment import adorn_datalog_program, AdornedPredicate, adorn_facts
-from datalog_parser import parse_datalog_program
+from binary_format import read_binary_program, write_binary_program
+from datalog_parser import (
+    parse_datalog_program,
+    parse_datalog_program_parallel,
+    parse_relevant_datalog_program,
+    parse_line,
+    scan_fact_signature,
+)
 from generation import execute_generation
-from models import DatalogProgram, Rule
+from models import DatalogProgram, Fact, FactStore, Rule
 from modification import modification_step
-from processing import generate_magic_facts_and_rules
+from parse_cache import compute_cache_key, load_cached_program, store_cached_program
+from processing import generate_bridge_rules, generate_magic_facts_and_rules
+from reader import STDIN_FILENAME, iter_datalog_program, open_datalog_file
+from sips import SIPS_STRATEGIES
 
 
-def read_datalog_program(filename: str) -> list:
+def load_datalog_program(
+    filename: str, jobs: int, binary_input: bool, relevant_facts_only: bool
+) -> DatalogProgram:
     """
-    Reads a Datalog program from a file and splits it into lines.
+    Loads a Datalog program from a text or binary file.
 
     Args:
         filename (str): The path to the file containing the Datalog program.
+        jobs (int): The number of worker processes used to parse a text file.
+        binary_input (bool): Whether the file is in the binary format.
+        relevant_facts_only (bool): Whether to skip the facts the query does not depend on.
 
     Returns:
-        list: A list of non-empty lines from the Datalog program, or an empty list if an error occurs.
+        DatalogProgram: The parsed program.
     """
-    try:
-        with open(filename, "r", encoding="utf-8") as file:
-            return [
-                line.strip()
-                for line in file
-                if line.strip() and not line.startswith("%")
-            ]
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"The file '{filename}' was not found.") from e
-    except PermissionError as e:
-        raise PermissionError(
-            f"Permission denied when trying to read '{filename}'."
-        ) from e
-    except OSError as e:  # Catching OSError which includes IOError
-        raise OSError(f"Error reading the file '{filename}': {e}") from e
+    if binary_input:
+        return read_binary_program(filename)
+    if relevant_facts_only:
+        return parse_relevant_datalog_program(filename)
+    if jobs > 1:
+        return parse_datalog_program_parallel(filename, jobs)
+    return parse_datalog_program(iter_datalog_program(filename))
 
 
 def apply_magic_set_transformation(
-    program: DatalogProgram, apply_reorder_optimization: bool
+    program: DatalogProgram,
+    sips: str,
+    use_bridge_rules: bool = False,
+    plan_log: Optional[TextIO] = None,
 ) -> DatalogProgram:
     """
     Applies the Magic Set transformation to a Datalog program, including adornment, magic rule generation,
@@ -48,35 +60,152 @@ def apply_magic_set_transformation(
 
     Args:
         program (DatalogProgram): The original Datalog program to transform.
-        apply_reorder_optimization (bool): Whether to apply greedy binding order optimization.
+        sips (str): The sideways information passing strategy ordering rule bodies.
+        plan_log (Optional[TextIO]): A stream to report the body order chosen for each rule to.
+        use_bridge_rules (bool): Whether to derive the adorned copies of the facts with one
+            bridge rule per adorned predicate instead of copying every fact.
 
     Returns:
         DatalogProgram: A new DatalogProgram object representing the transformed program.
     """
-    adorned_rules, query_adorned_atoms, query_adorned_predicates = (
-        adorn_datalog_program(program, apply_reorder_optimization)
+    rules, all_adorned_predicates, magic_seeds = transform_rules(
+        program, sips, plan_log
+    )
+    extensional_predicates = program.get_extensional_predicates()
+
+    # The original facts are shared with the new program rather than copied.
+    magic_program = DatalogProgram(FactStore(base=program.facts))
+    if use_bridge_rules:
+        rules += generate_bridge_rules(all_adorned_predicates, extensional_predicates)
+    else:
+        for relation in adorn_facts(program.facts, all_adorned_predicates):
+            magic_program.facts.merge_relation(relation)
+    for rule in rules:
+        magic_program.add_rule(rule)
+    magic_program.facts.extend(magic_seeds)
+    magic_program.set_query(program.query)
+
+    show_rules = get_show_rules(extensional_predicates)
+    magic_program.rules.extend(show_rules)
+
+    return magic_program
+
+
+def transform_rules(
+    program: DatalogProgram, sips: str, plan_log: Optional[TextIO] = None
+) -> Tuple[List[Rule], List[Tuple[str, str]], List[Fact]]:
+    """
+    Runs the rule-level stages of the Magic Set transformation: adornment, magic rule generation,
+    modification of rules with magic atoms, and generation of magic seeds and query rules.
+    Facts are never inspected, so the program may contain rules and the query only.
+
+    Args:
+        program (DatalogProgram): The program providing the rules and the query.
+        sips (str): The sideways information passing strategy ordering rule bodies.
+        plan_log (Optional[TextIO]): A stream to report the body order chosen for each rule to.
+
+    Returns:
+        Tuple[List[Rule], List[Tuple[str, str]], List[Fact]]: A tuple containing:
+            - The magic, modified and query rules, in output order.
+            - The unique (name, binding pattern) pairs of all adorned predicates.
+            - The magic seed facts.
+    """
+    adorned_rules, query_adorned_atoms, _ = adorn_datalog_program(
+        program, sips, plan_log
     )
     magic_rules = execute_generation(adorned_rules)
     modified_rules = modification_step(adorned_rules)
     all_adorned_predicates = get_unique_adorned_predicates(adorned_rules)
-    adorned_facts = adorn_facts(program.facts, all_adorned_predicates)
 
     magic_seeds, query_rules = generate_magic_facts_and_rules(
         query_adorned_atoms, all_adorned_predicates
     )
+    return (
+        magic_rules + modified_rules + query_rules,
+        all_adorned_predicates,
+        magic_seeds,
+    )
 
-    magic_program = DatalogProgram()
-    magic_program.facts.extend(program.facts)
-    extensional_predicates = magic_program.get_extensional_predicates()
-    magic_program.facts.extend(adorned_facts)
-    magic_program.rules.extend(magic_rules + modified_rules + query_rules)
-    magic_program.facts.extend(magic_seeds)
-    magic_program.set_query(program.query)
 
-    show_rules = get_show_rules(extensional_predicates)
-    magic_program.rules.extend(show_rules)
+def stream_magic_set_transformation(
+    filename: str,
+    output: TextIO,
+    sips: str,
+    use_bridge_rules: bool = False,
+    plan_log: Optional[TextIO] = None,
+) -> bool:
+    """
+    Applies the Magic Set transformation without materializing Fact objects.
 
-    return magic_program
+    Facts are only scanned for their predicate symbol and arity and are copied verbatim to the
+    output as soon as they are read, while rules and the query are parsed as usual. Once the
+    rules have been transformed, the file is read a second time to emit the adorned copies of
+    the facts whose predicate was adorned. Memory usage is therefore proportional to the number
+    of rules, not facts. Standard input cannot be read twice, so when reading from '-' the
+    fact lines are kept as plain strings until the adorned copies have been written. With
+    bridge rules no adorned copies are needed, so the file is read only once.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program, or '-'.
+        output (TextIO): The stream the transformed program is written to.
+        sips (str): The sideways information passing strategy ordering rule bodies.
+        plan_log (Optional[TextIO]): A stream to report the body order chosen for each rule to.
+        use_bridge_rules (bool): Whether to emit bridge rules instead of adorned fact copies.
+
+    Returns:
+        bool: False if the file contained no statements, True otherwise.
+    """
+    program = DatalogProgram()
+    extensional_predicates = set()
+    has_statements = False
+    fact_lines = [] if filename == STDIN_FILENAME and not use_bridge_rules else None
+
+    for line in iter_datalog_program(filename):
+        has_statements = True
+        if ":-" not in line:
+            extensional_predicates.add(scan_fact_signature(line))
+            output.write(line + "\n")
+            if fact_lines is not None:
+                fact_lines.append(line)
+            continue
+        rule = parse_line(line)
+        if rule.head.name == "goal__reachable":
+            program.set_query(rule)
+        else:
+            program.add_rule(rule)
+
+    if not has_statements:
+        return False
+
+    rules, all_adorned_predicates, magic_seeds = transform_rules(
+        program, sips, plan_log
+    )
+
+    binding_patterns = {}
+    if use_bridge_rules:
+        rules += generate_bridge_rules(all_adorned_predicates, extensional_predicates)
+    else:
+        for name, binding_pattern in all_adorned_predicates:
+            binding_patterns.setdefault(name, []).append(binding_pattern)
+    if binding_patterns:
+        if fact_lines is None:
+            fact_lines = (
+                line for line in iter_datalog_program(filename) if ":-" not in line
+            )
+        for line in fact_lines:
+            symbol, _ = scan_fact_signature(line)
+            args_str = line[len(symbol) :].lstrip()
+            for binding_pattern in binding_patterns.get(symbol, ()):
+                output.write(f"{symbol}_{binding_pattern}{args_str}\n")
+
+    for seed in magic_seeds:
+        output.write(f"{seed}\n")
+    output.write("\n")
+    for rule in rules + get_show_rules(extensional_predicates):
+        output.write(f"{rule}\n")
+    if program.query:
+        output.write(f"\n{program.query}\n")
+    return True
 
 
 def flatten(list_of_lists: List[List]) -> List:
@@ -121,32 +250,169 @@ def main():
         description="Optimize Datalog program execution with Magic Set method."
     )
     parser.add_argument(
-        "--program", type=str, required=True, help="Filename of the Datalog program."
+        "--program",
+        type=str,
+        required=True,
+        help="Filename of the Datalog program, or '-' to read it from standard input.",
+    )
+    parser.add_argument(
+        "--sips",
+        choices=SIPS_STRATEGIES,
+        default="none",
+        help="Sideways information passing strategy choosing the order of rule bodies: "
+        "keep it (none), extensional and wide atoms first (greedy), the atom with the "
+        "most bound arguments next (bound), or minimize the intermediate results "
+        "estimated from the fact statistics, either greedily (cost) or by dynamic "
+        "programming over the body atoms (dp).",
+    )
+    parser.add_argument(
+        "--show-plans",
+        action="store_true",
+        help="Print the body order chosen for each adorned rule and its estimated cost "
+        "to standard error.",
     )
     parser.add_argument(
         "--greedy-binding-order",
+        action="store_const",
+        const="greedy",
+        dest="sips",
+        help="Same as --sips greedy.",
+    )
+    parser.add_argument(
+        "--bridge-rules",
         action="store_true",
-        help="Apply greedy binding order optimization.",
+        help="Derive the adorned versions of facts with one rule per binding pattern, "
+        "such as p_bf(X, Y) :- p(X, Y), instead of copying the facts.",
+    )
+    parser.add_argument(
+        "--stream-facts",
+        action="store_true",
+        help="Copy facts verbatim to the output instead of parsing them into objects.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to parse the program.",
+    )
+    parser.add_argument(
+        "--relevant-facts-only",
+        action="store_true",
+        help="Load the rules first and discard the facts of predicates the query does "
+        "not depend on.",
+    )
+    parser.add_argument(
+        "--binary-input",
+        action="store_true",
+        help="Read the program from a binary file written with --save-binary.",
+    )
+    parser.add_argument(
+        "--save-binary",
+        type=str,
+        help="Write the parsed program to this file in the binary format.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Write the transformed program to this file instead of standard output. "
+        "Files ending in .gz, .bz2 or .xz are compressed.",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Dump statistics about the loaded program, including per-predicate "
+        "cardinalities, as JSON to FILE or, by default, to standard error.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Directory of a cache of parsed programs, keyed on the input file contents.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="Maximum size of the parse cache in megabytes (default: 1024).",
     )
 
     try:
         args = parser.parse_args()
+        plan_log = sys.stderr if args.show_plans else None
+
+        if args.stream_facts or args.program == STDIN_FILENAME:
+            if args.output:
+                with open_datalog_file(args.output, "wt") as output:
+                    has_data = stream_magic_set_transformation(
+                        args.program,
+                        output,
+                        args.sips,
+                        args.bridge_rules,
+                        plan_log,
+                    )
+            else:
+                has_data = stream_magic_set_transformation(
+                    args.program,
+                    sys.stdout,
+                    args.sips,
+                    args.bridge_rules,
+                    plan_log,
+                )
+            if not has_data:
+                print(f"No data to process from {args.program}, exiting.")
+            return
 
-        program_lines = read_datalog_program(args.program)
-        if not program_lines:
+        if args.cache_dir:
+            if args.binary_input:
+                input_format = "binary"
+            elif args.relevant_facts_only:
+                input_format = "text-relevant"
+            else:
+                input_format = "text"
+            cache_key = compute_cache_key(args.program, input_format)
+            datalog_program = load_cached_program(args.cache_dir, cache_key)
+            if datalog_program is None:
+                datalog_program = load_datalog_program(
+                    args.program,
+                    args.jobs,
+                    args.binary_input,
+                    args.relevant_facts_only,
+                )
+                store_cached_program(
+                    args.cache_dir,
+                    cache_key,
+                    datalog_program,
+                    args.cache_size * 1024 * 1024,
+                )
+        else:
+            datalog_program = load_datalog_program(
+                args.program, args.jobs, args.binary_input, args.relevant_facts_only
+            )
+        if not (
+            datalog_program.facts or datalog_program.rules or datalog_program.query
+        ):
             print(f"No data to process from {args.program}, exiting.")
             return
 
-        datalog_program = parse_datalog_program(program_lines)
-        if not datalog_program:
-            print("Failed to parse any data into a Datalog program, exiting.")
-            return
+        if args.stats == "-":
+            print(json.dumps(datalog_program.get_statistics()), file=sys.stderr)
+        elif args.stats:
+            with open(args.stats, "w", encoding="utf-8") as stats_file:
+                json.dump(datalog_program.get_statistics(), stats_file, indent=2)
+
+        if args.save_binary:
+            write_binary_program(datalog_program, args.save_binary)
 
         transformed_program = apply_magic_set_transformation(
-            datalog_program, args.greedy_binding_order
+            datalog_program, args.sips, args.bridge_rules, plan_log
         )
 
-        print(transformed_program)
+        if args.output:
+            with open_datalog_file(args.output, "wt") as output:
+                transformed_program.write_to(output)
+        else:
+            transformed_program.write_to(sys.stdout)
 
     except FileNotFoundError as e:
         print(e)
@@ -154,6 +420,10 @@ def main():
     except PermissionError as e:
         print(e)
         sys.exit(1)
+    except BrokenPipeError:
+        # The next stage of the pipeline stopped reading, e.g. `| head`.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         sys.exit(1)
@@ -1,14 +1,39 @@
-from dataclasses import dataclass
+import io
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Predicate:
     """
-    Represents a predicate in logic programming with a name and a list of arguments.
+    Represents a predicate in logic programming with a name and a tuple of arguments.
+    Predicates are immutable and hashable; the hash is computed once, at construction.
     """
 
     name: str
-    args: list
+    args: tuple
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if type(self.args) is not tuple:
+            object.__setattr__(self, "args", tuple(self.args))
+        object.__setattr__(self, "_hash", hash((self.name, self.args)))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            self._hash == other._hash
+            and self.name == other.name
+            and self.args == other.args
+        )
 
     def __repr__(self) -> str:
         return f"{self.name}({', '.join(self.args)})"
@@ -19,7 +44,26 @@ class Predicate:
     def arity(self):
         return len(self.args)
 
-@dataclass
+
+_atom_table: dict = {}
+
+
+def intern_atom(atom: Predicate) -> Predicate:
+    """
+    Returns the canonical instance of an atom, hash-consing structurally equal atoms into a
+    single shared object. Equality between interned atoms is therefore an identity check, and
+    memory scales with the number of distinct atoms rather than with their occurrences.
+
+    Args:
+        atom (Predicate): The atom to intern; AdornedPredicate instances are accepted as well.
+
+    Returns:
+        Predicate: The interned atom, which is the argument itself on its first occurrence.
+    """
+    return _atom_table.setdefault(atom, atom)
+
+
+@dataclass(frozen=True, slots=True)
 class Fact:
     """
     Represents a logical fact, essentially a wrapper for a Predicate object.
@@ -27,57 +71,450 @@ class Fact:
 
     predicate: Predicate
 
+    def __hash__(self) -> int:
+        return hash(self.predicate)
+
     def __repr__(self) -> str:
         return f"{self.predicate}."
 
     def get_predicate_symbol(self) -> str:
         return f"{self.predicate.get_name()}"
 
-
     def get_arity(self) -> int:
         return self.predicate.arity()
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Rule:
     """
-    Represents a logical rule, consisting of a head (a single Predicate) and a body (a list of Predicates).
+    Represents a logical rule, consisting of a head (a single Predicate) and a body (a tuple of Predicates).
+    Rules are immutable and hashable; the hash is computed once, at construction.
     """
 
     head: Predicate
-    body: list
+    body: tuple
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if type(self.body) is not tuple:
+            object.__setattr__(self, "body", tuple(self.body))
+        object.__setattr__(self, "_hash", hash((self.head, self.body)))
+
+    def __hash__(self) -> int:
+        return self._hash
 
     def __repr__(self) -> str:
         body_str = ", ".join(map(str, self.body))
         return f"{self.head} :- {body_str}."
 
 
+class SymbolTable:
+    """
+    Encodes symbols (predicate names and constants) as consecutive integer ids.
+    """
+
+    __slots__ = ("_ids", "_symbols")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+
+    def encode(self, symbol: str) -> int:
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._ids[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+        return symbol_id
+
+    def lookup(self, symbol: str) -> Optional[int]:
+        """Returns the id of a symbol, or None if it was never encoded."""
+        return self._ids.get(symbol)
+
+    def decode(self, symbol_id: int) -> str:
+        return self._symbols[symbol_id]
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._symbols)
+
+
+def _pack_row(ids) -> int:
+    """Packs the symbol ids of a row into a single integer, 32 bits per argument."""
+    key = 0
+    for symbol_id in ids:
+        key = (key << 32) | symbol_id
+    return key
+
+
+@dataclass
+class RelationStatistics:
+    """
+    Cardinality statistics of a relation, gathered while its facts are loaded.
+
+    Attributes:
+        name (str): The predicate symbol.
+        arity (int): The number of arguments.
+        tuple_count (int): The number of distinct facts.
+        distinct_values (List[int]): The number of distinct values in each argument position.
+        most_common_values (List[List[Tuple[str, int]]]): For each argument position, the most
+            frequent values with their number of occurrences, most frequent first.
+    """
+
+    name: str
+    arity: int
+    tuple_count: int
+    distinct_values: List[int]
+    most_common_values: List[List[Tuple[str, int]]]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "arity": self.arity,
+            "tuple_count": self.tuple_count,
+            "distinct_values": self.distinct_values,
+            "most_common_values": self.most_common_values,
+        }
+
+
+class Relation:
+    """
+    Stores the facts of one predicate column-wise: the i-th argument of every fact is kept,
+    encoded through the store's SymbolTable, in the i-th array('q') column. Relations have set
+    semantics: each row is also packed into a single integer key, and rows whose key is already
+    present are rejected on insertion. The number of occurrences of every value in every
+    column is counted as facts are inserted, to provide cardinality statistics.
+
+    Attributes:
+        name (str): The predicate symbol.
+        arity (int): The number of arguments of every fact.
+        binding_pattern (Optional[str]): The binding pattern of adorned facts, or None.
+        columns (List[array]): One array of symbol ids per argument position.
+    """
+
+    __slots__ = (
+        "name",
+        "arity",
+        "binding_pattern",
+        "atom_type",
+        "columns",
+        "count",
+        "symbols",
+        "value_counts",
+        "_keys",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        arity: int,
+        binding_pattern: Optional[str],
+        atom_type: type,
+        symbols: SymbolTable,
+    ):
+        self.name = name
+        self.arity = arity
+        self.binding_pattern = binding_pattern
+        self.atom_type = atom_type
+        self.columns = [array("q") for _ in range(arity)]
+        self.count = 0
+        self.symbols = symbols
+        self.value_counts = [Counter() for _ in range(arity)]
+        self._keys = set()
+
+    def __getstate__(self):
+        # The row keys are derived from the columns and rebuilt on the next insertion.
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "_keys"}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._keys = None
+
+    def copy(
+        self, binding_pattern: Optional[str] = None, atom_type: Optional[type] = None
+    ) -> "Relation":
+        """
+        Returns an independent copy of the relation, sharing the same SymbolTable. The copy
+        can be given another binding pattern and atom type, to adorn the facts in bulk.
+        """
+        relation = Relation(
+            self.name,
+            self.arity,
+            binding_pattern if binding_pattern is not None else self.binding_pattern,
+            atom_type if atom_type is not None else self.atom_type,
+            self.symbols,
+        )
+        relation.columns = [array("q", column) for column in self.columns]
+        relation.count = self.count
+        relation.value_counts = [Counter(counts) for counts in self.value_counts]
+        relation._keys = set(self._keys) if self._keys is not None else None
+        return relation
+
+    def _row_keys(self) -> set:
+        if self._keys is None:
+            self._keys = {_pack_row(row) for row in zip(*self.columns)}
+            if not self.arity and self.count:
+                self._keys.add(0)
+        return self._keys
+
+    def add(self, args: tuple) -> bool:
+        """Adds a fact given by its arguments; returns False if it was already present."""
+        encode = self.symbols.encode
+        ids = [encode(arg) for arg in args]
+        key = _pack_row(ids)
+        keys = self._row_keys()
+        if key in keys:
+            return False
+        keys.add(key)
+        for column, counts, symbol_id in zip(self.columns, self.value_counts, ids):
+            column.append(symbol_id)
+            counts[symbol_id] += 1
+        self.count += 1
+        return True
+
+    def extend_columns(self, columns: List[array], count: int):
+        """
+        Appends count facts given as columns of symbol ids, one per argument. The rows are
+        trusted to be distinct from each other and from the facts already present, as is the
+        case for the columns of another Relation.
+        """
+        for column, counts, ids in zip(self.columns, self.value_counts, columns):
+            column.extend(ids if ids.typecode == "q" else array("q", ids))
+            counts.update(ids)
+        self.count += count
+        self._keys = None
+
+    def frequency(self, position: int, value: str) -> int:
+        """Returns the number of facts having the given value in the given argument position."""
+        symbol_id = self.symbols.lookup(value)
+        if symbol_id is None:
+            return 0
+        return self.value_counts[position][symbol_id]
+
+    def distinct_values(self) -> List[int]:
+        """Returns the number of distinct values in each argument position."""
+        return [len(counts) for counts in self.value_counts]
+
+    def statistics(self, most_common: int = 5) -> RelationStatistics:
+        """
+        Returns the cardinality statistics of the relation.
+
+        Args:
+            most_common (int): How many of the most frequent values to report per column.
+        """
+        decode = self.symbols.decode
+        return RelationStatistics(
+            self.name,
+            self.arity,
+            self.count,
+            self.distinct_values(),
+            [
+                [
+                    (decode(symbol_id), n)
+                    for symbol_id, n in counts.most_common(most_common)
+                ]
+                for counts in self.value_counts
+            ],
+        )
+
+    def rows(self) -> Iterable[tuple]:
+        """Returns the decoded argument tuples of the facts, in insertion order."""
+        if not self.arity:
+            return [()] * self.count
+        decode = self.symbols.decode
+        return zip(*[map(decode, column) for column in self.columns])
+
+    def iter_statements(self) -> Iterator[str]:
+        """Yields the facts formatted as Datalog statements, without building Fact objects."""
+        name = self.name
+        if self.binding_pattern is not None:
+            name = f"{name}_{self.binding_pattern}"
+        for row in self.rows():
+            yield f"{name}({', '.join(row)})."
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Fact]:
+        name, atom_type = self.name, self.atom_type
+        extra = () if self.binding_pattern is None else (self.binding_pattern,)
+        for row in self.rows():
+            yield Fact(atom_type(name, row, *extra))
+
+
+class FactStore:
+    """
+    Columnar storage for the facts of a program, with one Relation per predicate symbol, arity
+    and binding pattern. Looking up the facts, the cardinality or the arity of a predicate takes
+    constant time, and each fact costs a single integer per argument. Iterating the store
+    yields Fact objects built on the fly, grouped by relation. Duplicate facts are dropped on
+    insertion and counted in duplicates.
+
+    A store may be layered over a base store, whose relations and SymbolTable it then shares
+    instead of copying them. The base is treated as immutable: a shared relation is copied
+    the first time a fact is added to it, so that only the new facts cost memory.
+    """
+
+    __slots__ = (
+        "symbols",
+        "relations",
+        "duplicates",
+        "base",
+        "_relations_by_name",
+        "_shared",
+    )
+
+    def __init__(self, facts: Iterable[Fact] = (), base: Optional["FactStore"] = None):
+        self.base = base
+        if base is None:
+            self.symbols = SymbolTable()
+            self.relations: Dict[Tuple[str, int, Optional[str]], Relation] = {}
+            self.duplicates = 0
+            self._relations_by_name: Dict[str, List[Relation]] = {}
+        else:
+            self.symbols = base.symbols
+            self.relations = dict(base.relations)
+            self.duplicates = base.duplicates
+            self._relations_by_name = {
+                name: list(relations)
+                for name, relations in base._relations_by_name.items()
+            }
+        self._shared = set(self.relations)
+        self.extend(facts)
+
+    def add(self, fact: Fact):
+        predicate = fact.predicate
+        binding_pattern = getattr(predicate, "binding_pattern", None)
+        key = (predicate.name, len(predicate.args), binding_pattern)
+        relation = self.relations.get(key)
+        if relation is None or key in self._shared:
+            relation = self.add_relation(*key, type(predicate))
+        if not relation.add(predicate.args):
+            self.duplicates += 1
+
+    def add_row(self, name: str, args: tuple):
+        """Adds the fact name(args) without building a Fact object."""
+        key = (name, len(args), None)
+        relation = self.relations.get(key)
+        if relation is None or key in self._shared:
+            relation = self.add_relation(name, len(args))
+        if not relation.add(args):
+            self.duplicates += 1
+
+    def extend(self, facts: Iterable[Fact]):
+        for fact in facts:
+            self.add(fact)
+
+    def add_relation(
+        self,
+        name: str,
+        arity: int,
+        binding_pattern: Optional[str] = None,
+        atom_type: type = Predicate,
+    ) -> Relation:
+        """
+        Returns the relation for a predicate, to which facts may be added, creating an empty
+        one if needed. A relation shared with the base store is copied first.
+        """
+        key = (name, arity, binding_pattern)
+        relation = self.relations.get(key)
+        if key in self._shared:
+            self._shared.discard(key)
+            copy = relation.copy()
+            self.relations[key] = copy
+            relations = self._relations_by_name[name]
+            relations[relations.index(relation)] = copy
+            relation = copy
+        elif relation is None:
+            relation = Relation(name, arity, binding_pattern, atom_type, self.symbols)
+            self.relations[key] = relation
+            self._relations_by_name.setdefault(name, []).append(relation)
+        return relation
+
+    def merge_relation(self, relation: Relation):
+        """
+        Adds the facts of a relation built on the same SymbolTable. The relation object itself
+        is adopted when the store has none with the same key yet, so nothing is copied.
+        """
+        if relation.symbols is not self.symbols:
+            raise ValueError(
+                "Only relations sharing the store's symbol table can be merged."
+            )
+        key = (relation.name, relation.arity, relation.binding_pattern)
+        if key not in self.relations:
+            self.relations[key] = relation
+            self._relations_by_name.setdefault(relation.name, []).append(relation)
+            return
+        target = self.add_relation(*key, relation.atom_type)
+        for args in relation.rows():
+            if not target.add(args):
+                self.duplicates += 1
+
+    def relation(
+        self, name: str, arity: int, binding_pattern: Optional[str] = None
+    ) -> Optional[Relation]:
+        return self.relations.get((name, arity, binding_pattern))
+
+    def relations_named(self, name: str) -> List[Relation]:
+        """Returns the relations of a predicate symbol, whatever their arity or binding pattern."""
+        return self._relations_by_name.get(name, [])
+
+    def __len__(self) -> int:
+        return sum(relation.count for relation in self.relations.values())
+
+    def __iter__(self) -> Iterator[Fact]:
+        for relation in list(self.relations.values()):
+            yield from relation
+
+
 @dataclass
 class DatalogProgram:
     """
     Manages a collection of facts, rules, and supports querying in a Datalog-like rule-based system.
     Efficiently checks for intensional predicates by caching head names. The query is represented as a Rule.
+
+    Rules are indexed by head and by body predicate symbol as they are added with add_rule, and
+    facts are indexed by predicate in the FactStore, so that the transformation stages can look
+    them up instead of scanning the whole program.
     """
 
-    facts: list = None
+    facts: FactStore = None
     rules: list = None
     query: Rule = None
     head_names: set = None
+    rules_by_head: dict = None
+    rules_by_body: dict = None
+    rule_signatures: set = None
 
     def __post_init__(self):
-        self.facts = self.facts if self.facts is not None else []
-        self.rules = self.rules if self.rules is not None else []
+        if not isinstance(self.facts, FactStore):
+            self.facts = FactStore(self.facts if self.facts is not None else ())
         self.head_names = self.head_names if self.head_names is not None else set()
+        self.rules_by_head = {}
+        self.rules_by_body = {}
+        self.rule_signatures = set()
+        rules, self.rules = self.rules, []
+        for rule in rules or ():
+            self.add_rule(rule)
 
     def add_fact(self, fact: Fact):
         if not isinstance(fact, Fact):
             raise ValueError("Only Fact instances can be added.")
-        self.facts.append(fact)
+        self.facts.add(fact)
 
     def add_rule(self, rule: Rule):
         if not isinstance(rule, Rule):
             raise ValueError("Only Rule instances can be added.")
         self.rules.append(rule)
         self.head_names.add(rule.head.name)
+        self.rules_by_head.setdefault(rule.head.name, []).append(rule)
+        self.rule_signatures.add((rule.head.name, rule.head.arity()))
+        for name in {predicate.name for predicate in rule.body}:
+            self.rules_by_body.setdefault(name, []).append(rule)
+        for predicate in rule.body:
+            self.rule_signatures.add((predicate.name, predicate.arity()))
 
     def set_query(self, query: Rule):
         if not isinstance(query, Rule):
@@ -87,19 +524,112 @@ class DatalogProgram:
     def is_predicate_intensional(self, predicate: Predicate) -> bool:
         return predicate.name in self.head_names
 
+    def get_rules_defining(self, name: str) -> list:
+        """Returns the rules whose head has the given predicate symbol, in program order."""
+        return self.rules_by_head.get(name, [])
+
+    def get_rules_using(self, name: str) -> list:
+        """Returns the rules whose body mentions the given predicate symbol, in program order."""
+        return self.rules_by_body.get(name, [])
+
+    def get_signatures(self) -> set:
+        """
+        Returns the catalog of (symbol, arity) pairs of all predicates occurring in the facts,
+        rule heads and rule bodies of the program.
+        """
+        return self.rule_signatures | self.get_extensional_predicates()
+
+    def get_relevant_predicates(self) -> set:
+        """
+        Returns the names of the predicates the query depends on, i.e. those occurring in the
+        query body and, transitively, in the bodies of the rules defining them.
+        """
+        if self.query is None:
+            return set()
+        relevant = {predicate.name for predicate in self.query.body}
+        pending = list(relevant)
+        while pending:
+            for rule in self.get_rules_defining(pending.pop()):
+                for predicate in rule.body:
+                    if predicate.name not in relevant:
+                        relevant.add(predicate.name)
+                        pending.append(predicate.name)
+        return relevant
+
     def get_extensional_predicates(self):
         """
         Returns a list [(s1, a1), ...] where sN is the N-th predicate symbol
         occurring in the initial set of facts, and aN is its arity.
         """
-        symbols = set()
-        for f in self.facts:
-            symbols.add((f.get_predicate_symbol(), f.get_arity()))
-        return symbols
+        return {(name, arity) for name, arity, _ in self.facts.relations}
+
+    def get_relation_statistics(self) -> Dict[Tuple[str, int], RelationStatistics]:
+        """
+        Returns the statistics catalog of the extensional predicates, keyed by (symbol, arity).
+        The statistics are maintained while facts are added, so this costs no pass over them.
+        """
+        return {
+            (relation.name, relation.arity): relation.statistics()
+            for relation in self.facts.relations.values()
+            if relation.binding_pattern is None
+        }
+
+    def get_statistics(self) -> dict:
+        """
+        Returns summary counts about the program and the statistics catalog of its
+        extensional predicates, as a JSON-serializable dictionary.
+        """
+        return {
+            "facts": len(self.facts),
+            "duplicate_facts_removed": self.facts.duplicates,
+            "relations": len(self.facts.relations),
+            "rules": len(self.rules),
+            "predicates": [
+                statistics.to_dict()
+                for statistics in self.get_relation_statistics().values()
+            ],
+        }
+
+    def write_to(self, stream: TextIO, buffer_size: int = 1 << 20):
+        """
+        Writes the program to a text stream: the facts, the rules (including any #show
+        directives) and the query, as blank-line separated sections.
+
+        Statements are formatted one at a time and written in chunks of about buffer_size
+        characters, so memory use does not grow with the size of the program.
+
+        Args:
+            stream (TextIO): The stream to write to.
+            buffer_size (int): The number of characters to accumulate before each write.
+        """
+        fact_statements = (
+            statement
+            for relation in self.facts.relations.values()
+            for statement in relation.iter_statements()
+        )
+        sections = [
+            fact_statements,
+            map(str, self.rules),
+            [str(self.query)] if self.query else [],
+        ]
+
+        chunk = []
+        chunk_size = 0
+        needs_separator = False
+        for section in sections:
+            separator = "\n" if needs_separator else ""
+            for statement in section:
+                chunk.append(separator + statement + "\n")
+                chunk_size += len(statement) + 2
+                separator = ""
+                needs_separator = True
+                if chunk_size >= buffer_size:
+                    stream.write("".join(chunk))
+                    chunk.clear()
+                    chunk_size = 0
+        stream.write("".join(chunk))
 
     def __repr__(self) -> str:
-        facts_str = "\n".join(map(str, self.facts))
-        rules_str = "\n".join(map(str, self.rules))
-        query_str = f"{self.query}" if self.query else ""
-        components = [part for part in [facts_str, rules_str, query_str] if part]
-        return "\n\n".join(components)
+        buffer = io.StringIO()
+        self.write_to(buffer)
+        return buffer.getvalue()[:-1]
@@ -19,7 +19,7 @@ def modify_rule_with_magic_atom(
     Returns:
         Rule: The modified rule with the magic atom added to its body.
     """
-    new_body = [magic_predicate] + adorned_rule.body
+    new_body = (magic_predicate,) + adorned_rule.body
     return Rule(adorned_rule.head, new_body)
 
 
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Optional
+
+from datalog_parser import PARSER_VERSION
+from models import DatalogProgram
+
+_CACHE_SUFFIX = ".pickle"
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def compute_cache_key(filename: str, input_format: str) -> str:
+    """
+    Computes the key under which the parsed form of a file is cached.
+
+    The key is a SHA-256 digest of the raw bytes of the file, salted with the parser version
+    and the input format, so that a change in any of them yields a different key.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program.
+        input_format (str): The name of the format the file is parsed as, e.g. 'text'.
+
+    Returns:
+        str: The hexadecimal cache key.
+    """
+    digest = hashlib.sha256(f"{PARSER_VERSION}:{input_format}:".encode("utf-8"))
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_cached_program(cache_dir: str, key: str) -> Optional[DatalogProgram]:
+    """
+    Loads a parsed program from the cache, marking it as the most recently used entry.
+
+    Args:
+        cache_dir (str): The directory holding the cache entries.
+        key (str): The cache key returned by compute_cache_key.
+
+    Returns:
+        Optional[DatalogProgram]: The cached program, or None if there is no usable entry.
+    """
+    path = os.path.join(cache_dir, key + _CACHE_SUFFIX)
+    try:
+        with open(path, "rb") as file:
+            program = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        # A truncated or outdated entry is treated as a miss and dropped.
+        _remove_quietly(path)
+        return None
+    os.utime(path)
+    return program
+
+
+def store_cached_program(
+    cache_dir: str, key: str, program: DatalogProgram, max_size: int
+):
+    """
+    Stores a parsed program in the cache, then evicts the least recently used entries until
+    the cache fits within max_size bytes.
+
+    Args:
+        cache_dir (str): The directory holding the cache entries.
+        key (str): The cache key returned by compute_cache_key.
+        program (DatalogProgram): The parsed program to store.
+        max_size (int): The maximum total size of the cache, in bytes.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump(program, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, os.path.join(cache_dir, key + _CACHE_SUFFIX))
+    except BaseException:
+        _remove_quietly(temporary_path)
+        raise
+    evict_cache_entries(cache_dir, max_size)
+
+
+def evict_cache_entries(cache_dir: str, max_size: int):
+    """
+    Removes the least recently used cache entries until the cache fits within max_size bytes.
+
+    Args:
+        cache_dir (str): The directory holding the cache entries.
+        max_size (int): The maximum total size of the cache, in bytes.
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(_CACHE_SUFFIX):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        _remove_quietly(path)
+        total_size -= size
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -1,8 +1,9 @@
-from typing import List, Tuple
+import sys
+from typing import Iterable, List, Tuple
 
 from adornment import AdornedPredicate
 from generation import generate_magic_predicate
-from models import Fact, Predicate, Rule
+from models import Fact, Predicate, Rule, intern_atom
 
 
 def generate_magic_facts_and_rules(
@@ -30,14 +31,46 @@ def generate_magic_facts_and_rules(
 
     for head, adornment in query_adorned_predicates:
         variable_names = generate_variable_names("Var_", len(adornment))
-        predicate_head = Predicate(head, variable_names)
-        predicate_body = AdornedPredicate(head, variable_names, adornment)
+        predicate_head = intern_atom(Predicate(head, variable_names))
+        predicate_body = intern_atom(AdornedPredicate(head, variable_names, adornment))
         query_rule = Rule(predicate_head, [predicate_body])
         query_rules.append(query_rule)
 
     return magic_seed_facts, query_rules
 
 
+def generate_bridge_rules(
+    adorned_predicates: List[Tuple[str, str]],
+    extensional_predicates: Iterable[Tuple[str, int]],
+) -> List[Rule]:
+    """
+    Generate one bridge rule, such as p_bf(Var_1, Var_2) :- p(Var_1, Var_2), for each adorned
+    predicate that also has facts. The rules make the facts available under the binding
+    pattern without copying them, so the output does not grow with the number of patterns.
+
+    Args:
+        adorned_predicates (List[Tuple[str, str]]): The (name, binding pattern) pairs.
+        extensional_predicates (Iterable[Tuple[str, int]]): The (name, arity) pairs of the facts.
+
+    Returns:
+        List[Rule]: The bridge rules.
+    """
+    arities = {}
+    for name, arity in extensional_predicates:
+        arities.setdefault(name, []).append(arity)
+
+    bridge_rules: List[Rule] = []
+    for name, binding_pattern in adorned_predicates:
+        for arity in sorted(arities.get(name, ())):
+            variable_names = generate_variable_names("Var_", arity)
+            bridge_head = intern_atom(
+                AdornedPredicate(name, variable_names, binding_pattern)
+            )
+            bridge_body = intern_atom(Predicate(name, variable_names))
+            bridge_rules.append(Rule(bridge_head, [bridge_body]))
+    return bridge_rules
+
+
 def create_magic_seed(adorned_predicate: AdornedPredicate) -> Fact:
     """
     Generates a magic seed predicate from an adorned predicate. Only bound arguments are retained.
@@ -62,4 +95,4 @@ def generate_variable_names(prefix: str, number: int) -> List[str]:
     Returns:
         List[str]: A list of unique variable names.
     """
-    return [f"{prefix}{i + 1}" for i in range(number)]
+    return [sys.intern(f"{prefix}{i + 1}") for i in range(number)]
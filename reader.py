@@ -0,0 +1,254 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import re
+import sys
+from typing import IO, Iterable, Iterator, List, Tuple
+
+COMPRESSED_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+STDIN_FILENAME = "-"
+
+_STATEMENT_LINE = re.compile(
+    rb"^[ \t\r\f\v]*([^%\s][^\n]*?)[ \t\r\f\v]*$", re.MULTILINE
+)
+# A whole line holding exactly one statement and nothing that needs the full splitter.
+_SIMPLE_STATEMENT = re.compile(r"\s*([^.%\"'\s][^.%\"']*\.)\s*")
+_STATEMENT_DELIMITER = re.compile(r"[\"'%().]")
+_STATEMENT_END = re.compile(rb"\.[ \t\r\f\v]*\n")
+
+
+def read_datalog_program(filename: str) -> list:
+    """
+    Reads a Datalog program from a file and splits it into statements.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program.
+
+    Returns:
+        list: A list of statements from the Datalog program, or an empty list if an error occurs.
+    """
+    return list(iter_datalog_program(filename))
+
+
+def is_compressed(filename: str) -> bool:
+    """Tells whether a file name has the extension of a supported compression format."""
+    return os.path.splitext(filename)[1] in COMPRESSED_OPENERS
+
+
+def open_datalog_file(filename: str, mode: str = "rt") -> IO:
+    """
+    Opens a file, transparently (de)compressing it when its name ends in .gz, .bz2 or .xz.
+
+    Args:
+        filename (str): The path to the file.
+        mode (str): The mode to open the file in, as accepted by open().
+
+    Returns:
+        IO: A file object streaming the uncompressed content.
+    """
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(filename)[1], open)
+    if "b" in mode:
+        return opener(filename, mode)
+    return opener(filename, mode, encoding="utf-8")
+
+
+def iter_datalog_program(filename: str) -> Iterator[str]:
+    """
+    Lazily yields the statements of a Datalog program file, without comments.
+
+    Plain files are memory-mapped and line boundaries are located directly in the mapped
+    buffer, so only the lines of the statement currently being parsed are ever decoded into
+    Python strings. Compressed files are decompressed on the fly, one line at a time, and
+    the file name '-' reads standard input as the lines arrive.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program, or '-'.
+
+    Yields:
+        str: Each stripped statement of the Datalog program, one at a time.
+    """
+    if filename == STDIN_FILENAME:
+        yield from iter_statements(sys.stdin)
+        return
+    try:
+        if is_compressed(filename):
+            with open_datalog_file(filename) as file:
+                yield from iter_statements(file)
+            return
+        with open(filename, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield from iter_statements(iter_buffer_lines(buffer))
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"The file '{filename}' was not found.") from e
+    except PermissionError as e:
+        raise PermissionError(
+            f"Permission denied when trying to read '{filename}'."
+        ) from e
+    except OSError as e:  # Catching OSError which includes IOError
+        raise OSError(f"Error reading the file '{filename}': {e}") from e
+
+
+def iter_datalog_program_range(filename: str, start: int, end: int) -> Iterator[str]:
+    """
+    Lazily yields the statements found in a byte range of a Datalog program file.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program.
+        start (int): Offset of the first byte of the range, which must start a statement.
+        end (int): Offset one past the last byte of the range, which must end a statement.
+
+    Yields:
+        str: Each stripped statement of the range, one at a time.
+    """
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            with memoryview(buffer) as view:
+                with view[start:end] as chunk:
+                    yield from iter_statements(iter_buffer_lines(chunk))
+
+
+def split_datalog_program(filename: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Splits a Datalog program file into byte ranges of roughly equal size. Each range ends
+    right after a line whose last character is a '.', so that statements spanning several
+    lines are never cut in half.
+
+    Args:
+        filename (str): The path to the file containing the Datalog program.
+        parts (int): The desired number of ranges.
+
+    Returns:
+        List[Tuple[int, int]]: Consecutive (start, end) byte offsets covering the whole file.
+    """
+    try:
+        with open(filename, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return []
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                ranges = []
+                start = 0
+                for part in range(1, parts):
+                    match = _STATEMENT_END.search(
+                        buffer, max(start, size * part // parts)
+                    )
+                    if match is None:
+                        break
+                    ranges.append((start, match.end()))
+                    start = match.end()
+                if start < size:
+                    ranges.append((start, size))
+                return ranges
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"The file '{filename}' was not found.") from e
+    except PermissionError as e:
+        raise PermissionError(
+            f"Permission denied when trying to read '{filename}'."
+        ) from e
+    except OSError as e:  # Catching OSError which includes IOError
+        raise OSError(f"Error reading the file '{filename}': {e}") from e
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Groups lines of Datalog text into complete statements.
+
+    A statement ends with a '.' that is outside of quotes and parentheses, so statements may
+    span several lines and a line may hold several statements. Comments start with '%' outside
+    of quotes and run to the end of the line. Only the statement being assembled is kept in
+    memory, so arbitrarily large streams are split with bounded memory.
+
+    Args:
+        lines (Iterable[str]): The lines of the program, e.g. an open text file.
+
+    Yields:
+        str: Each stripped statement, including its terminating '.', one at a time.
+    """
+    parts = []
+    depth = 0
+    quote = None
+    for line in lines:
+        if not parts and quote is None:
+            match = _SIMPLE_STATEMENT.fullmatch(line)
+            if match is not None:
+                yield match.group(1)
+                continue
+
+        start = 0
+        pos = 0
+        end = len(line)
+        while True:
+            if quote is not None:
+                pos = _find_closing_quote(line, pos, quote)
+                if pos == -1:
+                    break
+                quote = None
+                continue
+            match = _STATEMENT_DELIMITER.search(line, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"' or char == "'":
+                quote = char
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif char == "%":
+                end = match.start()
+                break
+            elif depth <= 0:
+                parts.append(line[start:pos])
+                statement = "".join(parts).strip()
+                if statement:
+                    yield statement
+                parts = []
+                depth = 0
+                start = pos
+
+        rest = line[start:end]
+        if quote is not None or rest.strip():
+            # Keep the line break, so that tokens on consecutive lines stay apart.
+            parts.append(rest if rest.endswith("\n") else rest + "\n")
+
+    statement = "".join(parts).strip()
+    if statement:
+        yield statement
+
+
+def _find_closing_quote(line: str, pos: int, quote: str) -> int:
+    """Returns the position right after the quote closing a string, or -1 if the line ends first."""
+    while True:
+        end = line.find(quote, pos)
+        if end == -1:
+            return -1
+        backslashes = 0
+        while end - backslashes > pos and line[end - backslashes - 1] == "\\":
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return end + 1
+        pos = end + 1
+
+
+def iter_buffer_lines(buffer) -> Iterator[str]:
+    """
+    Yields the non-empty, non-comment lines of a UTF-8 encoded buffer.
+
+    Each line is decoded straight from a memoryview slice of the buffer, without creating
+    an intermediate bytes copy.
+
+    Args:
+        buffer: Any object supporting the buffer protocol, such as an mmap or bytes.
+
+    Yields:
+        str: Each stripped line of the buffer, one at a time.
+    """
+    with memoryview(buffer) as view:
+        for match in _STATEMENT_LINE.finditer(buffer):
+            start, end = match.span(1)
+            yield str(view[start:end], "utf-8")
@@ -0,0 +1,323 @@
+from typing import Callable, Dict, List, Optional, Set, TextIO, Tuple
+
+from models import DatalogProgram, Predicate, Rule
+
+# Sideways information passing strategies that can be selected with --sips.
+SIPS_STRATEGIES = ("none", "greedy", "bound", "cost", "dp")
+
+# Bodies longer than this are ordered by cost_based_order instead of the exponential search.
+DP_MAX_ATOMS = 12
+
+# Estimates used for intensional predicates, whose size is not known before evaluation.
+DEFAULT_CARDINALITY = 1000.0
+DEFAULT_DISTINCT_VALUES = 100.0
+
+
+def is_variable(arg: str) -> bool:
+    """Returns whether a term is a variable, i.e. starts with an uppercase letter or '_'."""
+    first = arg[:1]
+    return first.isupper() or first == "_"
+
+
+def greedy_binding_order(
+    datalog_program: DatalogProgram, body: List[Predicate]
+) -> List[Predicate]:
+    """
+    Sorts the predicates in a rule's body with a focus on optimization for query processing.
+    Extensional predicates are prioritized over intensional ones, and within the same category,
+    predicates with more arguments are given higher priority.
+
+    Args:
+        datalog_program (DatalogProgram): The Datalog program to query predicate status.
+        body (List[Predicate]): A list of Predicate objects that make up the body of a rule.
+
+    Returns:
+        List[Predicate]: A sorted list of Predicate objects based on defined criteria.
+    """
+
+    def sort_key(predicate: Predicate) -> tuple:
+        """
+        Defines the sorting criteria for predicates:
+        - First by type (extensional: 0, intensional: 1)
+        - Then by the number of arguments in descending order
+
+        Args:
+        - predicate (Predicate): The predicate to evaluate for sorting.
+
+        Returns:
+        - tuple: Tuple where the first element is type priority, and the second is the negative argument count.
+        """
+        is_intensional = datalog_program.is_predicate_intensional(predicate)
+        type_priority = 1 if is_intensional else 0
+        return (type_priority, -len(predicate.args))
+
+    ordered_body = sorted(body, key=sort_key)
+    return ordered_body
+
+
+class CostModel:
+    """
+    Estimates the size of the intermediate results of evaluating a rule body left to right,
+    from the statistics catalog of the program's facts (see Relation.statistics).
+
+    The size of an extensional atom is its tuple count. Joining on a variable that is already
+    bound divides the size by the larger of the numbers of distinct values of the variable and
+    of the argument position, and a constant argument multiplies it by the fraction of the facts
+    having that value. Intensional atoms get default estimates. When the program has no facts
+    loaded, as in streaming mode, every atom gets the default estimates, so that orders only
+    differ by how many of their arguments are bound.
+    """
+
+    __slots__ = ("datalog_program", "has_statistics", "_estimates")
+
+    def __init__(self, datalog_program: DatalogProgram):
+        self.datalog_program = datalog_program
+        self.has_statistics = bool(datalog_program.facts.relations)
+        self._estimates: Dict[Tuple[str, int], Tuple[float, List[float]]] = {}
+
+    def estimate(self, predicate: Predicate) -> Tuple[float, List[float]]:
+        """Returns the estimated cardinality and distinct values per column of an atom."""
+        key = (predicate.name, len(predicate.args))
+        estimate = self._estimates.get(key)
+        if estimate is None:
+            relation = self.datalog_program.facts.relation(*key)
+            if (
+                not self.has_statistics
+                or self.datalog_program.is_predicate_intensional(predicate)
+            ):
+                cardinality = DEFAULT_CARDINALITY + (relation.count if relation else 0)
+                distinct = [DEFAULT_DISTINCT_VALUES] * len(predicate.args)
+            elif relation is None:
+                cardinality, distinct = 0.0, [1.0] * len(predicate.args)
+            else:
+                cardinality = float(relation.count)
+                distinct = [float(max(n, 1)) for n in relation.distinct_values()]
+            estimate = self._estimates[key] = (cardinality, distinct)
+        return estimate
+
+    def selectivity(self, predicate: Predicate, position: int, value: str) -> float:
+        """Returns the estimated fraction of an atom's facts having a constant argument."""
+        _, distinct = self.estimate(predicate)
+        relation = self.datalog_program.facts.relation(
+            predicate.name, len(predicate.args)
+        )
+        if (
+            not self.has_statistics
+            or relation is None
+            or not relation.count
+            or self.datalog_program.is_predicate_intensional(predicate)
+        ):
+            return 1.0 / distinct[position]
+        return relation.frequency(position, value) / relation.count
+
+    def join(
+        self, size: float, distinct_values: Dict[str, float], predicate: Predicate
+    ) -> Tuple[float, Dict[str, float]]:
+        """
+        Returns the estimated size of joining an intermediate result with an atom, together
+        with the distinct values of the variables bound afterwards.
+
+        Args:
+            size (float): The estimated size of the intermediate result.
+            distinct_values (Dict[str, float]): The estimated distinct values of its variables.
+            predicate (Predicate): The atom to join.
+        """
+        cardinality, distinct = self.estimate(predicate)
+        size *= cardinality
+        distinct_values = dict(distinct_values)
+        for position, arg in enumerate(predicate.args):
+            if not is_variable(arg):
+                size *= self.selectivity(predicate, position, arg)
+            elif arg in distinct_values:
+                size /= max(distinct_values[arg], distinct[position])
+                distinct_values[arg] = min(distinct_values[arg], distinct[position])
+            else:
+                distinct_values[arg] = distinct[position]
+        return size, distinct_values
+
+    def initial_state(
+        self, bound_variables: Set[str]
+    ) -> Tuple[float, Dict[str, float]]:
+        """Returns the size and distinct values before the body, with one head binding."""
+        return 1.0, {arg: 1.0 for arg in bound_variables if is_variable(arg)}
+
+    def plan_cost(self, body: List[Predicate], bound_variables: Set[str]) -> float:
+        """Returns the estimated cost of an order, i.e. the sum of its intermediate sizes."""
+        size, distinct_values = self.initial_state(bound_variables)
+        cost = 0.0
+        for predicate in body:
+            size, distinct_values = self.join(size, distinct_values, predicate)
+            cost += size
+        return cost
+
+
+def cost_based_order(
+    cost_model: CostModel, body: List[Predicate], bound_variables: Set[str]
+) -> List[Predicate]:
+    """
+    Orders a rule body greedily by estimated cost: at each step, the atom that yields the
+    smallest intermediate result is joined next, ties keeping the original order.
+
+    Args:
+        cost_model (CostModel): The cost model of the program.
+        body (List[Predicate]): The atoms of the rule body.
+        bound_variables (Set[str]): The variables bound before the body is evaluated.
+
+    Returns:
+        List[Predicate]: The reordered body.
+    """
+    remaining = list(body)
+    size, distinct_values = cost_model.initial_state(bound_variables)
+    ordered_body = []
+    while remaining:
+        best = None
+        for index, predicate in enumerate(remaining):
+            joined = cost_model.join(size, distinct_values, predicate)
+            if best is None or joined[0] < best[0][0]:
+                best = (joined, index)
+        (size, distinct_values), index = best
+        ordered_body.append(remaining.pop(index))
+    return ordered_body
+
+
+def bound_is_easier_order(
+    cost_model: CostModel, body: List[Predicate], bound_variables: Set[str]
+) -> List[Predicate]:
+    """
+    Orders a rule body by the bound-is-easier heuristic: at each step, the atom with the most
+    arguments already bound, by the head, by the atoms before it or by being constants, is
+    chosen next. Ties prefer extensional atoms, then smaller relations, then the original order.
+    Unlike greedy_binding_order, the choice is revised after every atom, so an atom whose
+    variables are all bound is never placed after one with no bound variables.
+
+    Args:
+        cost_model (CostModel): The cost model of the program, providing relation sizes.
+        body (List[Predicate]): The atoms of the rule body.
+        bound_variables (Set[str]): The variables bound before the body is evaluated.
+
+    Returns:
+        List[Predicate]: The reordered body.
+    """
+    datalog_program = cost_model.datalog_program
+    remaining = list(body)
+    bound_variables = set(bound_variables)
+    ordered_body = []
+
+    def sort_key(index: int) -> tuple:
+        predicate = remaining[index]
+        bound_count = sum(
+            1
+            for arg in predicate.args
+            if arg in bound_variables or not is_variable(arg)
+        )
+        is_intensional = datalog_program.is_predicate_intensional(predicate)
+        return (-bound_count, is_intensional, cost_model.estimate(predicate)[0], index)
+
+    while remaining:
+        predicate = remaining.pop(min(range(len(remaining)), key=sort_key))
+        ordered_body.append(predicate)
+        bound_variables.update(predicate.args)
+    return ordered_body
+
+
+def dynamic_programming_order(
+    cost_model: CostModel, body: List[Predicate], bound_variables: Set[str]
+) -> List[Predicate]:
+    """
+    Orders a rule body by dynamic programming over its subsets of atoms, in the style of the
+    System R optimizer: the cheapest left-deep order of every subset is extended by one atom at
+    a time, so the order of the whole body minimizes the sum of the estimated intermediate
+    sizes. The search takes O(2^n * n) steps, so bodies of more than DP_MAX_ATOMS atoms are
+    ordered greedily by cost_based_order instead.
+
+    Args:
+        cost_model (CostModel): The cost model of the program.
+        body (List[Predicate]): The atoms of the rule body.
+        bound_variables (Set[str]): The variables bound before the body is evaluated.
+
+    Returns:
+        List[Predicate]: The reordered body.
+    """
+    if len(body) > DP_MAX_ATOMS:
+        return cost_based_order(cost_model, body, bound_variables)
+
+    size, distinct_values = cost_model.initial_state(bound_variables)
+    # Maps each subset, as a bit mask of body positions, to its cheapest plan so far:
+    # (cost, size, distinct values, order). Subsets are numerically smaller than their
+    # supersets, so visiting the masks in increasing order completes every plan before use.
+    plans = {0: (0.0, size, distinct_values, ())}
+    for mask in range(1 << len(body)):
+        plan = plans.pop(mask, None)
+        if plan is None:
+            continue
+        cost, size, distinct_values, order = plan
+        if len(order) == len(body):
+            return [body[index] for index in order]
+        for index, predicate in enumerate(body):
+            if mask & (1 << index):
+                continue
+            joined_size, joined_distinct_values = cost_model.join(
+                size, distinct_values, predicate
+            )
+            joined_mask = mask | (1 << index)
+            best = plans.get(joined_mask)
+            if best is None or cost + joined_size < best[0]:
+                plans[joined_mask] = (
+                    cost + joined_size,
+                    joined_size,
+                    joined_distinct_values,
+                    order + (index,),
+                )
+    return list(body)
+
+
+def make_body_order(
+    datalog_program: DatalogProgram, sips: str, plan_log: Optional[TextIO] = None
+) -> Optional[Callable[[Rule, Set[str]], List[Predicate]]]:
+    """
+    Returns the function ordering rule bodies for a strategy, or None to keep the order.
+
+    Args:
+        datalog_program (DatalogProgram): The program whose rules are adorned.
+        sips (str): One of SIPS_STRATEGIES.
+        plan_log (Optional[TextIO]): A stream to which each ordered rule is reported, together
+            with the estimated cost of its body order.
+
+    Returns:
+        A function mapping a rule and the variables bound by its head to a new body order.
+    """
+    cost_model = CostModel(datalog_program)
+    if sips == "none":
+        order_body = None
+    elif sips == "greedy":
+        order_body = lambda rule, bound_variables: greedy_binding_order(
+            datalog_program, rule.body
+        )
+    elif sips == "bound":
+        order_body = lambda rule, bound_variables: bound_is_easier_order(
+            cost_model, rule.body, bound_variables
+        )
+    elif sips == "cost":
+        order_body = lambda rule, bound_variables: cost_based_order(
+            cost_model, rule.body, bound_variables
+        )
+    elif sips == "dp":
+        order_body = lambda rule, bound_variables: dynamic_programming_order(
+            cost_model, rule.body, bound_variables
+        )
+    else:
+        raise ValueError(f"Unknown sideways information passing strategy '{sips}'.")
+    if plan_log is None:
+        return order_body
+
+    def order_and_report(rule: Rule, bound_variables: Set[str]) -> List[Predicate]:
+        body = (
+            list(rule.body) if order_body is None else order_body(rule, bound_variables)
+        )
+        cost = cost_model.plan_cost(body, bound_variables)
+        bound = ", ".join(sorted(bound_variables))
+        plan = ", ".join(map(str, body))
+        plan_log.write(f"% {sips} [{bound}] cost {cost:.6g}: {rule.head} :- {plan}.\n")
+        return body
+
+    return order_and_report